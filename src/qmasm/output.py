@@ -4,10 +4,27 @@
 ###################################
 
 import datetime
+import itertools
 import json
+import numpy as np
 import random
 import shlex
 import sys
+from collections import defaultdict
+from operator import itemgetter
+
+# Serialize with orjson when it happens to be installed; it encodes large
+# problems several times faster than the standard json module.
+try:
+    import orjson
+
+    def _dump_json(obj, outfile):
+        "Write an object to a file as sorted, indented JSON."
+        outfile.write(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2).decode())
+except ImportError:
+    def _dump_json(obj, outfile):
+        "Write an object to a file as sorted, indented JSON."
+        json.dump(obj, outfile, indent=2, sort_keys=True)
 
 class OutputMixin(object):
     "Provide functions for outputting problems and solutions."
@@ -18,7 +35,7 @@ class OutputMixin(object):
             outfile = sys.stdout
         else:
             try:
-                outfile = open(oname, "w")
+                outfile = open(oname, "w", buffering=1<<20)
             except IOError:
                 self.abend('Failed to open %s for output' % oname)
         return outfile
@@ -33,7 +50,7 @@ class OutputMixin(object):
         # Prepare the "easy" fields.
         bqp = {}
         bqp["version"] = "1.0.0"
-        bqp["id"] = random.randint(2**20, 2**60)
+        bqp["id"] = (1 << 20) + random.getrandbits(40)
         bqp["scale"] = 1.0
         bqp["offset"] = 0.0
         if as_qubo:
@@ -50,7 +67,7 @@ class OutputMixin(object):
 
         # Prepare the linear terms.
         lin_terms = []
-        for q, wt in sorted(problem.weights.items()):
+        for q, wt in sorted(problem.weights.items(), key=itemgetter(0)):
             lin_terms.append({
                 "id": q,
                 "coeff": wt})
@@ -59,7 +76,7 @@ class OutputMixin(object):
         # Prepare the quadratic terms.
         quad_terms = []
         strengths = self.canonicalize_strengths(problem.strengths)
-        for (q1, q2), wt in sorted(strengths.items()):
+        for (q1, q2), wt in sorted(strengths.items(), key=itemgetter(0)):
             quad_terms.append({
                 "id_tail": q1,
                 "id_head": q2,
@@ -78,18 +95,24 @@ class OutputMixin(object):
                                       for s, n in self.sym_map.symbol_number_items()}
         bqp["metadata"] = metadata
 
-        # Output the problem in JSON format.
-        outfile.write(json.dumps(bqp, indent=2, sort_keys=True) + "\n")
+        # Output the problem in JSON format, streaming it to the file rather
+        # than first materializing the entire document as a string.
+        _dump_json(bqp, outfile)
+        outfile.write("\n")
 
     def output_minizinc(self, outfile, problem, energy=None):
         "Output weights and strengths as a MiniZinc constraint problem."
+        # Accumulate all output in a buffer so we can issue a single write
+        # call at the very end.
+        buf = []
+
         # Write some header information.
-        outfile.write("""% Use MiniZinc to minimize a given Hamiltonian.
+        buf.append("""% Use MiniZinc to minimize a given Hamiltonian.
     %
     % Producer:     QMASM (https://github.com/lanl/qmasm/)
     % Author:       Scott Pakin (pakin@lanl.gov)
     """)
-        outfile.write("%% Command line: %s\n\n" % " ".join([shlex.quote(a) for a in sys.argv]))
+        buf.append("%% Command line: %s\n\n" % " ".join([shlex.quote(a) for a in sys.argv]))
 
         # The model is easier to express as a QUBO so convert to that format.
         if problem.qubo:
@@ -97,66 +120,72 @@ class OutputMixin(object):
         else:
             qprob = problem.convert_to_qubo()
 
-        # Map each qubit to one or more symbols.
-        num2syms = {}
-        for s, n in self.sym_map.symbol_number_items():
-            try:
-                # Physical problem
+        # Sort the weights and strengths once and reuse the results below.
+        sorted_weights = sorted(qprob.weights.items(), key=itemgetter(0))
+        sorted_strengths = sorted(qprob.strengths.items(), key=itemgetter(0))
+
+        # Map each qubit to one or more symbols.  Test for an embedding once
+        # rather than catching AttributeError on every symbol.
+        sni = self.sym_map.symbol_number_items()
+        num2syms = defaultdict(list)
+        if hasattr(qprob, "embedding"):
+            # Physical problem
+            for s, n in sni:
                 for pn in qprob.embedding[n]:
-                    try:
-                        num2syms[pn].append(s)
-                    except KeyError:
-                        num2syms[pn] = [s]
-            except AttributeError:
-                # Logical problem
-                try:
-                    num2syms[n].append(s)
-                except KeyError:
-                    num2syms[n] = [s]
+                    num2syms[pn].append(s)
+        else:
+            # Logical problem
+            for s, n in sni:
+                num2syms[n].append(s)
         for n in num2syms.keys():
             num2syms[n].sort(key=lambda s: ("$" in s, s))
 
-        # Find the character width of the longest list of symbol names.
-        max_sym_name_len = max([len(repr(ss)) - 1 for ss in num2syms.values()] + [7])
+        # Find the character width of the longest list of symbol names as it
+        # will actually be written (space-separated).
+        max_sym_name_len = max(7, max((len(" ".join(ss)) for ss in num2syms.values()), default=7))
 
         # Output all QMASM variables as MiniZinc variables.
-        qubits_used = set(qprob.weights.keys())
-        qubits_used.update([qs[0] for qs in qprob.strengths.keys()])
-        qubits_used.update([qs[1] for qs in qprob.strengths.keys()])
+        qubits_used = set().union(qprob.weights.keys(), *zip(*qprob.strengths.keys()))
         for q in sorted(qubits_used):
-            outfile.write("var 0..1: q%d;  %% %s\n" % (q, " ".join(num2syms[q])))
-        outfile.write("\n")
+            buf.append("var 0..1: q%d;  %% %s\n" % (q, " ".join(num2syms[q])))
+        buf.append("\n")
 
         # Define variables representing products of QMASM variables.  Constrain
         # the product variables to be the products.
-        outfile.write("% Define p_X_Y variables and constrain them to be the product of qX and qY.\n")
-        for q0, q1 in sorted(qprob.strengths.keys()):
-            pstr = "p_%d_%d" % (q0, q1)
-            outfile.write("var 0..1: %s;\n" % pstr)
-            outfile.write("constraint %s >= q%d + q%d - 1;\n" % (pstr, q0, q1))
-            outfile.write("constraint %s <= q%d;\n" % (pstr, q0))
-            outfile.write("constraint %s <= q%d;\n" % (pstr, q1))
-        outfile.write("\n")
+        buf.append("% Define p_X_Y variables and constrain them to be the product of qX and qY.\n")
+        prod_tmpl = ("var 0..1: p_{a}_{b};\n"
+                     "constraint p_{a}_{b} >= q{a} + q{b} - 1;\n"
+                     "constraint p_{a}_{b} <= q{a};\n"
+                     "constraint p_{a}_{b} <= q{b};\n").format
+        for (q0, q1), s in sorted_strengths:
+            buf.append(prod_tmpl(a=q0, b=q1))
+        buf.append("\n")
 
-        # Express energy as one, big Hamiltonian.
+        # Express energy as one, big Hamiltonian.  Stream the terms into the
+        # output buffer rather than materializing the entire expression as a
+        # single, large string.
         scale_to_int = lambda f: int(round(10000.0*f))
-        outfile.write("var int: energy =\n")
-        weight_terms = ["%8d * q%d" % (scale_to_int(wt), q) for q, wt in sorted(qprob.weights.items())]
-        strength_terms = ["%8d * p_%d_%d" % (scale_to_int(s), qs[0], qs[1]) for qs, s in sorted(qprob.strengths.items())]
-        all_terms = weight_terms + strength_terms
-        outfile.write("  %s;\n" % " +\n  ".join(all_terms))
+        buf.append("var int: energy =\n  ")
+        first = True
+        for q, wt in sorted_weights:
+            buf.append(("" if first else " +\n  ") + "%8d * q%d" % (scale_to_int(wt), q))
+            first = False
+        for qs, s in sorted_strengths:
+            buf.append(("" if first else " +\n  ") + "%8d * p_%d_%d" % (scale_to_int(s), qs[0], qs[1]))
+            first = False
+        buf.append(";\n")
 
         # Because we can't both minimize and enumerate all solutions, we
         # normally do only the former with instructions for the user on how to
         # switch to the latter.  However, if an energy was specified, comment
         # out the minimization step and uncomment the enumeration step.
-        outfile.write("\n")
-        outfile.write("% First pass: Compute the minimum energy.\n")
+        buf.append("\n")
+        buf.append("% First pass: Compute the minimum energy.\n")
         if energy == None:
-            outfile.write("solve minimize energy;\n")
+            buf.append("solve minimize energy;\n")
         else:
-            outfile.write("% solve minimize energy;\n")
-        outfile.write("""
+            buf.append("% solve minimize energy;\n")
+        buf.append("""
 %% Second pass: Find all minimum-energy solutions.
 %%
 %% Once you've solved for minimum energy, comment out the "solve minimize
@@ -167,20 +196,20 @@ class OutputMixin(object):
 %% instead of show(energy/%.10g + %.10g).
 """ % (self.minizinc_scale_factor, qprob.bqm.offset))
         if energy == None:
-            outfile.write("%constraint energy = -12345;\n")
-            outfile.write("%solve satisfy;\n\n")
+            buf.append("%constraint energy = -12345;\n")
+            buf.append("%solve satisfy;\n\n")
         else:
-            outfile.write("constraint energy = %d;\n" % energy)
-            outfile.write("solve satisfy;\n\n")
+            buf.append("constraint energy = %d;\n" % energy)
+            buf.append("solve satisfy;\n\n")
 
         # Output code to show the results symbolically.  We output in the same
         # format as QMASM normally does.  Unfortunately, I don't know how to get
         # MiniZinc to output the current solution number explicitly so I had to
         # hard-wire "Solution #1".
-        outfile.write("output [\n")
-        outfile.write('  "Solution #1 (energy = ", show(energy/%.10g + %.10g), ", tally = 1)\\n\\n",\n' % (self.minizinc_scale_factor, qprob.bqm.offset))
-        outfile.write('  "    %-*s  Spin  Boolean\\n",\n' % (max_sym_name_len, "Name(s)"))
-        outfile.write('  "    %s  ----  -------\\n",\n' % ("-" * max_sym_name_len))
+        buf.append("output [\n")
+        buf.append('  "Solution #1 (energy = ", show(energy/%.10g + %.10g), ", tally = 1)\\n\\n",\n' % (self.minizinc_scale_factor, qprob.bqm.offset))
+        buf.append('  "    %-*s  Spin  Boolean\\n",\n' % (max_sym_name_len, "Name(s)"))
+        buf.append('  "    %s  ----  -------\\n",\n' % ("-" * max_sym_name_len))
         outlist = []
         for n, ss in num2syms.items():
             if ss == []:
@@ -196,35 +225,48 @@ class OutputMixin(object):
             line += '"\\n"'
             outlist.append(line)
         outlist.sort()
-        outfile.write("  %s\n];\n" % ",\n  ".join(outlist))
+        buf.append("  %s\n];\n" % ",\n  ".join(outlist))
+
+        # Flush the accumulated output with a single write call.
+        outfile.write("".join(buf))
 
     def output_qbsolv(self, outfile, problem):
         "Output weights and strengths in qbsolv format."
         # Determine the list of nonzero weights and strengths.
         qprob = problem.convert_to_qubo()
         output_weights, output_strengths = qprob.weights, qprob.strengths
-        max_node = max(list(output_weights.keys()) + [max(qs) for qs in output_strengths.keys()])
+        max_node = max(itertools.chain(output_weights.keys(),
+                                       (q for qs in output_strengths.keys() for q in qs)))
         num_nonzero_weights = len([q for q, wt in output_weights.items() if wt != 0.0])
         num_nonzero_strengths = len([qs for qs, wt in output_strengths.items() if wt != 0.0])
 
         # Assign dummy qubit numbers to qubits whose value is known a priori.
+        # Walk the known values only once, pairing each symbol and value with
+        # its new qubit number.
         try:
-            n_known = len(qprob.known_values)
-        except TypeError:
-            n_known = 0
-        try:
-            extra_nodes = dict(zip(sorted(qprob.known_values.keys()),
-                                   range(max_node + 1, max_node + 1 + n_known)))
-        except AttributeError:
-            extra_nodes = {}
+            sorted_known = sorted(qprob.known_values.items(), key=itemgetter(0))
+        except (AttributeError, TypeError):
+            sorted_known = []
+        n_known = len(sorted_known)
+        new_nums = range(max_node + 1, max_node + 1 + n_known)
+        extra_nodes = dict(zip((sym for sym, val in sorted_known), new_nums))
         max_node += n_known
         num_nonzero_weights += n_known
-        output_weights.update({num: qprob.known_values[sym]*qmasm.pin_weight
-                               for sym, num in extra_nodes.items()})
+        output_weights.update({num: val*qmasm.pin_weight
+                               for (sym, val), num in zip(sorted_known, new_nums)})
         sym2num = dict(self.sym_map.symbol_number_items())
         sym2num.update(extra_nodes)
 
-        # Output a name-to-number map as header comments.
+        # Output a name-to-number map as header comments.  The known values
+        # and pin map are loop invariants so compute them only once.
+        try:
+            # Physical problem
+            known_values = qprob.logical.merged_known_values()
+            pin_map = {k: v for k, v in qprob.logical.pinned}
+        except AttributeError:
+            # Logical problem
+            known_values = qprob.merged_known_values()
+            pin_map = {k: v for k, v in qprob.pinned}
         key_width = 0
         val_width = 0
         items = []
@@ -233,14 +275,6 @@ class OutputMixin(object):
                 key_width = len(s)
 
             # Map logical to physical if possible.
-            try:
-                # Physical problem
-                known_values = qprob.logical.merged_known_values()
-                pin_map = {k: v for k, v in qprob.logical.pinned}
-            except AttributeError:
-                # Logical problem
-                known_values = qprob.merged_known_values()
-                pin_map = {k: v for k, v in qprob.pinned}
             try:
                 nstr = " ".join([str(n) for n in sorted(qprob.embedding[n])])
             except AttributeError:
@@ -262,17 +296,20 @@ class OutputMixin(object):
                 val_width = len(nstr)
             items.append((s, nstr))
         items.sort()
-        for s, nstr in items:
-            outfile.write("c %-*s --> %-*s\n" % (key_width, s, val_width, nstr))
-
-        # Output all nonzero weights and strengths.
-        outfile.write("p qubo 0 %d %d %d\n" % (max_node + 1, num_nonzero_weights, num_nonzero_strengths))
-        for q, wt in sorted(output_weights.items()):
-            if wt != 0.0:
-                outfile.write("%d %d %.10g\n" % (q, q, wt))
-        for qs, wt in sorted(output_strengths.items()):
-            if wt != 0.0:
-                outfile.write("%d %d %.10g\n" % (qs[0], qs[1], wt))
+        header_lines = ["c %-*s --> %-*s" % (key_width, s, val_width, nstr)
+                        for s, nstr in items]
+
+        # Output all nonzero weights and strengths with a single write call
+        # rather than one write call per line.
+        header_lines.append("p qubo 0 %d %d %d" % (max_node + 1, num_nonzero_weights, num_nonzero_strengths))
+        fmt = "{0} {1} {2:.10g}".format
+        weight_lines = [fmt(q, q, wt)
+                        for q, wt in sorted(output_weights.items(), key=itemgetter(0))
+                        if wt != 0.0]
+        strength_lines = [fmt(qs[0], qs[1], wt)
+                          for qs, wt in sorted(output_strengths.items(), key=itemgetter(0))
+                          if wt != 0.0]
+        outfile.write("\n".join(header_lines + weight_lines + strength_lines) + "\n")
 
     def output_qubist(self, outfile, as_qubo, problem, sampler):
         "Output weights and strengths in Qubist format, either Ising or QUBO."
@@ -285,15 +322,29 @@ class OutputMixin(object):
         output_weights = prob.weights
         output_strengths = prob.strengths
 
-        # Format all weights and all strengths in Qubist format.
-        data = []
-        for q, wt in sorted(output_weights.items()):
-            if wt != 0.0:
-                data.append("%d %d %.10g" % (q, q, wt))
-        for sp, str in sorted(output_strengths.items()):
-            if str != 0.0:
-                sp = sorted(sp)
-                data.append("%d %d %.10g" % (sp[0], sp[1], str))
+        # Format all weights and all strengths in Qubist format.  For large
+        # problems the zero filtering and number formatting dominate so we
+        # perform both in NumPy rather than looping in Python.
+        nwts = len(output_weights)
+        wt_qubits = np.fromiter(output_weights.keys(), dtype=np.int64, count=nwts)
+        wt_vals = np.fromiter(output_weights.values(), dtype=np.float64, count=nwts)
+        order = np.argsort(wt_qubits)
+        wt_qubits, wt_vals = wt_qubits[order], wt_vals[order]
+        nonzero = wt_vals != 0.0
+        wt_qubits, wt_vals = wt_qubits[nonzero], wt_vals[nonzero]
+        wt_strs = np.char.mod("%d ", wt_qubits)
+        data = (wt_strs + wt_strs + np.char.mod("%.10g", wt_vals)).tolist()
+        if len(output_strengths) > 0:
+            sp_pairs = np.array(list(output_strengths.keys()), dtype=np.int64)
+            st_vals = np.fromiter(output_strengths.values(), dtype=np.float64,
+                                  count=len(output_strengths))
+            order = np.lexsort((sp_pairs[:, 1], sp_pairs[:, 0]))
+            sp_pairs, st_vals = sp_pairs[order], st_vals[order]
+            nonzero = st_vals != 0.0
+            sp_pairs, st_vals = sp_pairs[nonzero], st_vals[nonzero]
+            data.extend((np.char.mod("%d ", np.amin(sp_pairs, axis=1)) +
+                         np.char.mod("%d ", np.amax(sp_pairs, axis=1)) +
+                         np.char.mod("%.10g", st_vals)).tolist())
 
         # Output the header and data in Qubist format.
         try:
@@ -304,8 +355,8 @@ class OutputMixin(object):
             # qubits we require.
             num_qubits = len(output_weights)
         outfile.write("%d %d\n" % (num_qubits, len(data)))
-        for d in data:
-            outfile.write("%s\n" % d)
+        if data != []:
+            outfile.write("\n".join(data) + "\n")
 
     def write_output(self, problem, oname, oformat, as_qubo, sampler):
         "Write an output file in one of a variety of formats."
@@ -326,7 +326,7 @@ class Rename(Statement):
             except KeyError:
                 pass
             weights[q] = wt
-        problem.weights = defaultdict(lambda: 0.0, weights)
+        problem.weights = defaultdict(float, weights)
 
         # Update all strengths.
         strengths = {}
@@ -340,7 +340,7 @@ class Rename(Statement):
             except KeyError:
                 pass
             strengths[(q1, q2)] = wt
-        problem.strengths = defaultdict(lambda: 0.0, strengths)
+        problem.strengths = defaultdict(float, strengths)
 
         # Update all chains.
         chains = set()
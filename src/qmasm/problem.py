@@ -18,8 +18,8 @@ class Problem(object):
     def __init__(self, qmasm, qubo):
         self.qmasm = qmasm   # Pointer to the top-level QMASM class
         self.qubo = qubo     # True=QUBO; False=Ising
-        self.weights = defaultdict(lambda: 0.0)    # Map from a spin to a point weight
-        self.strengths = defaultdict(lambda: 0.0)  # Map from a pair of spins to a coupler strength
+        self.weights = defaultdict(float)    # Map from a spin to a point weight
+        self.strengths = defaultdict(float)  # Map from a pair of spins to a coupler strength
         self.chains = set()       # Subset of strengths keys that represents user-defined chains (always logical)
         self.antichains = set()   # Subset of strengths keys that represents user-defined anti-chains (always logical)
         self.assertions = []      # List of assertions (as ASTs) to enforce
@@ -105,7 +105,7 @@ class Problem(object):
 
     def _edges_to_adj_list(self, edges):
         "Convert a list of edges to an adjacency list."
-        adj = defaultdict(lambda: [])
+        adj = defaultdict(list)
         for u, v in edges:
             adj[u].append(v)
             adj[v].append(u)
@@ -346,8 +346,6 @@ class Problem(object):
 
         # Output some additional chain statistics.
         chain_lens = [len(c) for c in self.embedding.values()]
-        max_chain_len = 0
-        if chain_lens != []:
-            max_chain_len = max(chain_lens)
-        num_max_chains = len([l for l in chain_lens if l == max_chain_len])
+        max_chain_len = max(chain_lens, default=0)
+        num_max_chains = sum(1 for l in chain_lens if l == max_chain_len)
         sys.stderr.write("    Maximum chain length = %d (occurrences = %d)\n\n" % (max_chain_len, num_max_chains))
@@ -8,6 +8,11 @@ import math
 import numpy as np
 import re
 import sys
+from collections import defaultdict
+
+# Regular expression that matches an array element like "name[123]".  The
+# pattern is anchored so it can be applied with match.
+_IDX_RE = re.compile(r'([^\[\]]+)\[(\d+)\]$')
 from dwave.embedding import unembed_sampleset, chain_breaks, chain_break_frequency
 from scipy.stats import median_absolute_deviation
 
@@ -158,27 +163,23 @@ class Solution:
     def _numeric_solution(self):
         "Convert single- and multi-bit values to numbers."
         # Map each name to a number and to the number of bits required.
-        idx_re = re.compile(r'^([^\[\]]+)\[(\d+)\]$')
-        name2num = {}
-        name2nbits = {}
+        idx_match = _IDX_RE.match
+        name2num = defaultdict(int)
+        name2nbits = defaultdict(int)
         for nm, bval in self.sym2bool.items():
             # Parse the name into a prefix and array index.
-            match = idx_re.search(nm)
+            match = idx_match(nm)
             if match == None:
                 # No array index: Treat as a 1-bit number.
-                name2num[nm] = int(bval)
-                name2nbits[nm] = 1
+                name2num[nm] |= int(bval)
+                name2nbits[nm] = max(name2nbits[nm], 1)
                 continue
 
             # Integrate the current spin into the overall number.
             array, idx = match.groups()
-            b = int(bval) << int(idx)
-            try:
-                name2num[array] += b
-                name2nbits[array] = max(name2nbits[array], int(idx) + 1)
-            except KeyError:
-                name2num[array] = b
-                name2nbits[array] = int(idx) + 1
+            idx = int(idx)
+            name2num[array] |= int(bval) << idx
+            name2nbits[array] = max(name2nbits[array], idx + 1)
 
         # Merge the two maps.
         return {nm: (name2num[nm], name2nbits[nm]) for nm in name2num.keys()}
@@ -190,7 +191,7 @@ class Solution:
         if verbosity < 2:
             all_syms = [s for s in all_syms if "$" not in s]
         all_syms = sorted(all_syms)
-        max_sym_name_len = max(8, max([len(s) for s in all_syms]))
+        max_sym_name_len = max(8, max((len(s) for s in all_syms), default=0))
 
         # Output one symbol per line.
         print("    %-*s  Value" % (max_sym_name_len, "Variable"))
@@ -207,7 +208,7 @@ class Solution:
         name2info = self._numeric_solution()
         if verbosity < 2:
             name2info = {n: i for n, i in name2info.items() if "$" not in n}
-        max_sym_name_len = max([len(s) for s in list(name2info.keys()) + ["Name"]])
+        max_sym_name_len = max(len("Name"), max((len(s) for s in name2info.keys()), default=0))
         max_decimal_len = 7
         max_binary_len = 6
         name2strs = {}
@@ -327,13 +328,9 @@ class Solutions(object):
         if full_output:
             # Merge energies based on a fixed number of digits after
             # the decimal point.
-            raw_hist = {}
+            raw_hist = defaultdict(int)
             for e, t in energies_tallies:
-                estr = "%11.4f" % e
-                try:
-                    raw_hist[estr] += t
-                except KeyError:
-                    raw_hist[estr] = t
+                raw_hist["%11.4f" % e] += t
 
             # Output a histogram of energy values.
             sys.stderr.write("Histogram of raw energy values (merged to 4 digits after the decimal point):\n\n")
@@ -344,9 +341,8 @@ class Solutions(object):
             sys.stderr.write("\n")
 
         # Compute various statistics on the raw energies.
-        raw_energies = np.array([v
-                                 for lst in [[e]*t for e, t in energies_tallies]
-                                 for v in lst])
+        raw_energies = np.repeat(self.answer.record.energy,
+                                 self.answer.record.num_occurrences)
         raw_min = np.amin(raw_energies)
         raw_mean = np.mean(raw_energies)
         raw_median = np.median(raw_energies)
@@ -355,9 +351,8 @@ class Solutions(object):
         raw_max = np.amax(raw_energies)
 
         # Compute various statistics on the filtered energies.
-        filtered_energies = np.array([v
-                                      for lst in [[s.energy]*s.tally for s in filtered_solns.solutions]
-                                      for v in lst])
+        filtered_energies = np.repeat([s.energy for s in filtered_solns.solutions],
+                                      [s.tally for s in filtered_solns.solutions])
         if len(filtered_energies) == 0:
             filtered_min = math.nan
             filtered_mean = math.nan
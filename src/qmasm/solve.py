@@ -13,6 +13,7 @@ import os
 import re
 import sys
 import time
+from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
 from dimod import ExactSolver, SampleSet
 from dwave.cloud import Client
@@ -215,16 +216,10 @@ class Sampler(object):
 
         # Convert from vertex pairs to a dictionary from a vertex to its
         # neighbors.  Note that we treat all edges as bidirectional.
-        adj_dict = {}
+        adj_dict = defaultdict(list)
         for u, v in adj:
-            try:
-                adj_dict[u].append(v)
-            except KeyError:
-                adj_dict[u] = [v]
-            try:
-                adj_dict[v].append(u)
-            except KeyError:
-                adj_dict[v] = [u]
+            adj_dict[u].append(v)
+            adj_dict[v].append(u)
         return adj_dict
 
     def _find_embedding(self, edges, adj, **kwargs):
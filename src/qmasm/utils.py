@@ -4,7 +4,6 @@
 ###################################
 
 from collections import defaultdict
-import copy
 import math
 import qmasm
 import sys
@@ -25,46 +24,52 @@ class Utilities(object):
         "Issue a warning message but continue execution."
         sys.stderr.write("%s: Warning: %s\n" % (sys.argv[0], str))
 
+    def _resolve_next(self, sym, prefix, next_prefix):
+        'Replace "!next." in a symbol name by substituting prefixes.'
+        # In the common case we search the symbol once for the complete
+        # needle rather than scanning first for "!next." and again for the
+        # replacement.
+        if prefix != None and next_prefix != None:
+            needle = prefix + "!next."
+            if needle in sym:
+                sym = sym.replace(needle, next_prefix)
+        elif "!next." in sym:
+            raise RemainingNextException
+        return sym
+
     def symbol_to_number(self, sym, prefix=None, next_prefix=None):
         "Map from a symbol to a number, creating a new association if necessary."
-        # Replace "!next." by substituting prefixes in the name.
-        if "!next." in sym:
-            if prefix == None or next_prefix == None:
-                raise RemainingNextException
-            sym = sym.replace(prefix + "!next.", next_prefix)
+        sym = self._resolve_next(sym, prefix, next_prefix)
 
         # Return the symbol's logical qubit number or allocate a new one.
-        try:
-            return self.sym_map.to_number(sym)
-        except KeyError:
-            return self.sym_map.new_symbol(sym)
+        # dict.get avoids both the exception machinery and a method dispatch
+        # on what is by far the most common lookup in the assembler.
+        sym_map = self.sym_map
+        num = sym_map.sym2num.get(sym)
+        if num == None:
+            num = sym_map.new_symbol(sym)
+        return num
 
     def apply_prefix(self, sym, prefix=None, next_prefix=None):
         "Apply a prefix to a symbol name, replacing !next. with the next prefix."
         if prefix != None:
             sym = prefix + sym
-        if "!next." in sym:
-            if prefix == None or next_prefix == None:
-                raise RemainingNextException
-            sym = sym.replace(prefix + "!next.", next_prefix)
-        return sym
+        return self._resolve_next(sym, prefix, next_prefix)
 
     def canonicalize_strengths(self, strs):
         "Combine edges (A, B) and (B, A) into (A, B) with A < B."
-        new_strs = defaultdict(lambda: 0.0)
+        new_strs = defaultdict(float)
         for (q1, q2), wt in strs.items():
-            if q1 == q2:
-                continue          # Discard vertex weights.
-            if wt == 0.0:
-                continue          # Discard zero weights.
-            if q1 > q2:
-                q1, q2 = q2, q1   # Canonicalize vertex order.
-            new_strs[(q1, q2)] += wt
+            if q1 == q2 or wt == 0.0:
+                continue          # Discard vertex weights and zero weights.
+            new_strs[(q1, q2) if q1 < q2 else (q2, q1)] += wt
         return new_strs
 
 class SymbolMapping:
     "Map between symbols and numbers."
 
+    __slots__ = ("sym2num", "num2syms", "next_sym_num")
+
     def __init__(self):
         self.sym2num = {}
         self.num2syms = {}
@@ -130,35 +135,31 @@ class SymbolMapping:
 
         # Replace all occurrences of the larger number with the smaller in
         # num2syms.
-        new_num = min(num1, num2)
-        old_num = max(num1, num2)
-        self.num2syms[new_num].update(self.num2syms[old_num])
+        new_num, old_num = (num1, num2) if num1 < num2 else (num2, num1)
+        moved = self.num2syms[old_num]
+        self.num2syms[new_num].update(moved)
         del self.num2syms[old_num]
 
-        # Regenerate sym2num from num2syms.
-        self.sym2num = {}
-        for n, ss in self.num2syms.items():
-            for s in ss:
-                self.sym2num[s] = n
+        # Remap only the moved symbols in sym2num rather than regenerating
+        # the entire map from num2syms.
+        for s in moved:
+            self.sym2num[s] = new_num
         return new_num
 
     def overwrite_with(self, sym2num):
         "Overwrite the map's contents with a given symbol-to-number map."
         self.sym2num = sym2num
-        self.num2syms = {}
-        for s, n in self.sym2num.items():
-            try:
-                self.num2syms[n].add(s)
-            except KeyError:
-                self.num2syms[n] = set([s])
-        if len(self.num2syms.keys()) == 0:
-            self.next_sym_num = 0
-        else:
-            self.next_sym_num = max(self.num2syms.keys()) + 1
+        buckets = defaultdict(set)
+        for s, n in sym2num.items():
+            buckets[n].add(s)
+        self.num2syms = dict(buckets)
+        self.next_sym_num = max(self.num2syms, default=-1) + 1
 
     def replace_all(self, before_syms, after_syms):
         "Replace each symbol in before_syms with its peer in after_syms."
-        sym2num = copy.deepcopy(self.sym2num)
+        # A shallow copy suffices: the map's keys are strings and its values
+        # are ints, neither of which hold mutable state.
+        sym2num = self.sym2num.copy()
         before_nums = []
         for s in before_syms:
             try: